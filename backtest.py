@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+EMA Crossover Backtest (EMA 기간 튜닝용)
+- bot.py와 같은 규칙(골든 크로스 매수 / 데드 크로스 전량 매도)을 과거 봉에 적용
+- EMA(short, long) 조합 전체를 NumPy 배열 연산으로 한 번에 시뮬레이션
+- 사용법: python backtest.py [봉 개수, 기본 2000]
+"""
+
+import sys
+import logging
+import numpy as np
+import pyupbit
+
+from config import COINS, INTERVAL, EMA_SHORT, EMA_LONG
+
+SHORT_SPANS = range(3, 21)
+LONG_SPANS = range(10, 61, 5)
+FEE_RATE = 0.0005  # 업비트 KRW 마켓 수수료 (매수/매도 각각)
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+logger = logging.getLogger("upbit-backtest")
+
+
+def ema_matrix(closes, spans):
+    """spans 각각에 대한 EMA(adjust=False)를 (len(spans), len(closes)) 배열로 계산"""
+    alphas = 2.0 / (np.asarray(spans, dtype=float) + 1.0)
+    emas = np.empty((len(alphas), len(closes)))
+    emas[:, 0] = closes[0]
+    for i in range(1, len(closes)):
+        emas[:, i] = alphas * closes[i] + (1.0 - alphas) * emas[:, i - 1]
+    return emas
+
+
+def backtest_grid(closes, short_spans=SHORT_SPANS, long_spans=LONG_SPANS, fee=FEE_RATE):
+    """모든 (short, long) 조합의 누적 수익률과 거래 횟수 반환"""
+    pairs = [(s, l) for s in short_spans for l in long_spans if s < l]
+    spans = sorted({s for s, _ in pairs} | {l for _, l in pairs})
+    emas = ema_matrix(closes, spans)
+    row = {span: i for i, span in enumerate(spans)}
+    diff = np.stack([emas[row[s]] - emas[row[l]] for s, l in pairs])
+
+    # 크로스 이벤트: +1 골든(매수), -1 데드(매도), 0 없음
+    prev, cur = diff[:, :-1], diff[:, 1:]
+    events = np.zeros_like(diff, dtype=np.int8)
+    events[:, 1:][(prev <= 0) & (cur > 0)] = 1
+    events[:, 1:][(prev >= 0) & (cur < 0)] = -1
+
+    # 마지막 이벤트를 앞으로 채워 보유 여부 계산 (봉 종가에 체결, 다음 봉부터 수익 반영)
+    last = np.where(events != 0, np.arange(events.shape[1]), 0)
+    np.maximum.accumulate(last, axis=1, out=last)
+    holding = np.take_along_axis(events, last, axis=1) == 1
+
+    held = holding[:, :-1]
+    returns = closes[1:] / closes[:-1] - 1.0
+    growth = np.prod(1.0 + held * returns, axis=1)
+    trades = np.count_nonzero(np.diff(held.astype(np.int8), axis=1), axis=1)
+    # 마지막 봉까지 보유 중인 포지션은 청산했다고 보고 매도 수수료도 차감
+    growth *= (1.0 - fee) ** (trades + held[:, -1])
+    return pairs, growth - 1.0, trades
+
+
+def main(count=2000):
+    for ticker in COINS:
+        df = pyupbit.get_ohlcv(ticker, interval=INTERVAL, count=count)
+        if df is None or len(df) < max(LONG_SPANS) * 2:
+            logger.warning("%s OHLCV 데이터 부족, 건너뜀", ticker)
+            continue
+        closes = df['close'].to_numpy(dtype=float)
+        pairs, rets, trades = backtest_grid(closes)
+        order = np.argsort(rets)[::-1]
+
+        logger.info("%s %d봉 (%s ~ %s), 보유만 했을 때 %.2f%%",
+                    ticker, len(closes), df.index[0], df.index[-1], (closes[-1] / closes[0] - 1) * 100)
+        current = pairs.index((EMA_SHORT, EMA_LONG)) if (EMA_SHORT, EMA_LONG) in pairs else None
+        if current is not None:
+            logger.info("  현재 설정 EMA%d/EMA%d: %.2f%% (거래 %d회)",
+                        EMA_SHORT, EMA_LONG, rets[current] * 100, trades[current])
+        for i in order[:5]:
+            logger.info("  EMA%d/EMA%d: %.2f%% (거래 %d회)", pairs[i][0], pairs[i][1], rets[i] * 100, trades[i])
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
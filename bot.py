@@ -10,25 +10,35 @@ Upbit EMA Crossover Trading Bot (BTC/ETH/XRP)
 
 import time
 import os
+import json
 import logging
+import signal
 from dotenv import load_dotenv
 import pyupbit
+from pyupbit import request_api as _pyupbit_request_api
+import requests
+from requests.adapters import HTTPAdapter, Retry
 import pandas as pd
-from datetime import datetime
-import traceback
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import COINS, INTERVAL, EMA_SHORT, EMA_LONG
 
 # Load environment variables from .env (if exists)
 load_dotenv()
 
-# Configuration
-COINS = ["KRW-BTC", "KRW-ETH", "KRW-XRP"]
-INTERVAL = "minute15"
-EMA_SHORT = 7
-EMA_LONG = 25
+# Configuration (COINS / INTERVAL / EMA 기간은 config.py)
+_CURRENCY = {t: t.split("-", 1)[1] for t in COINS}  # 'KRW-BTC' -> 'BTC'
 SLEEP_SECONDS = 30  # 루프 대기 (초)
+RESYNC_EVERY_TICKS = int(os.getenv("RESYNC_EVERY_TICKS", "10"))  # 주문이 없을 때 잔고 재조회 주기 (루프 횟수)
 ALLOCATION_PER_TRADE = 0.1  # 매수 시 KRW 잔고의 몇 퍼센트로 매수할지 (예: 0.1 = 10%)
 MIN_KRW_ORDER = 5000  # 업비트 최소원금 (KRW)
 DRY_RUN = True if os.getenv("DRY_RUN", "true").lower() in ("1", "true", "yes") else False
+STATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "state.json")  # 재시작 시 복원할 상태
+
+# 시뮬레이션 잔고 (DRY_RUN일 때 사용, 시작 시 한 번만 읽음)
+SIM_BALANCES = {"KRW": float(os.getenv("SIM_KRW_BALANCE", "100000"))}
+SIM_BALANCES.update({c: float(os.getenv(f"SIM_BAL_{c}", "0")) for c in _CURRENCY.values()})
 
 # Load API keys (optional, 필요 시 .env에 설정)
 ACCESS = os.getenv("UPBIT_ACCESS_KEY", "")
@@ -55,74 +65,175 @@ else:
         logger.warning("API 키 없음 또는 DRY_RUN 모드가 켜져 있습니다. 시뮬레이션으로 동작합니다.")
 
 
+def _install_http_session():
+    """pyupbit의 HTTP 호출이 매번 새 연결 대신 keep-alive 세션을 재사용하도록 교체"""
+    if getattr(_pyupbit_request_api, "requests", None) is not requests:
+        logger.warning("pyupbit 내부 구조가 달라 공유 HTTP 세션을 적용하지 않습니다.")
+        return None
+    session = requests.Session()
+    # 일시적인 연결 오류는 짧게 재시도 (POST 주문은 urllib3 기본값상 요청 전송 후에는 재전송하지 않음)
+    retry = Retry(total=3, backoff_factor=0.3)
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=retry)
+    session.mount("https://", adapter)
+    # request_api는 requests.get/post/delete만 사용하므로 Session으로 대체 가능
+    _pyupbit_request_api.requests = session
+    return session
+
+
+HTTP_SESSION = _install_http_session()
+
+
+class TokenBucket:
+    """간단한 토큰 버킷: 토큰이 없을 때만 필요한 만큼 대기"""
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0.0
+            # 대기분까지 미리 차감해 두면 다른 스레드는 그 다음 순번으로 대기
+            self.tokens -= 1
+        if wait > 0:
+            time.sleep(wait)
+
+
+# 업비트 시세(Quotation) API 요청 제한: 초당 10회
+QUOTATION_BUCKET = TokenBucket(rate=10, capacity=10)
+
+# 시세 조회용 스레드 풀 (코인별 OHLCV 요청을 동시에 수행)
+_FETCH_POOL = ThreadPoolExecutor(max_workers=len(COINS))
+
+# (ticker, interval) -> 마지막으로 받은 OHLCV DataFrame
+_OHLCV_CACHE = {}
+
+
+def _refresh_ohlcv_tail(ticker, interval, cached, count):
+    """캐시된 봉은 재사용하고 최근 2개 봉(직전 봉 + 진행 중인 봉)만 다시 받아 병합"""
+    try:
+        QUOTATION_BUCKET.acquire()
+        tail = pyupbit.get_ohlcv(ticker, interval=interval, count=2)
+    except Exception as e:
+        logger.warning("get_ohlcv(tail) 실패 %s: %s", ticker, e)
+        return None
+    # 봉이 2개 이상 건너뛰었으면(장시간 중단 등) 전체 재조회
+    if tail is None or len(tail) < 2 or tail.index[0] not in cached.index:
+        return None
+    df = pd.concat([cached[cached.index < tail.index[0]], tail]).iloc[-count:]
+    _OHLCV_CACHE[(ticker, interval)] = df
+    return df
+
+
 def safe_get_ohlcv(ticker, interval=INTERVAL, count=100):
     """pyupbit.get_ohlcv 래퍼: 실패 시 재시도"""
+    cached = _OHLCV_CACHE.get((ticker, interval))
+    if cached is not None and len(cached) >= count:
+        df = _refresh_ohlcv_tail(ticker, interval, cached, count)
+        if df is not None:
+            return df
     for attempt in range(3):
         try:
+            QUOTATION_BUCKET.acquire()
             df = pyupbit.get_ohlcv(ticker, interval=interval, count=count)
             if df is not None and len(df) >= EMA_LONG + 5:
+                _OHLCV_CACHE[(ticker, interval)] = df
                 return df
         except Exception as e:
-            logger.warning(f"get_ohlcv 실패 {ticker} attempt={attempt+1}: {e}")
+            logger.warning("get_ohlcv 실패 %s attempt=%d: %s", ticker, attempt + 1, e)
         time.sleep(1 + attempt)
     return None
 
 
-def calculate_emas(df, short=EMA_SHORT, long=EMA_LONG):
-    closes = df['close']
-    ema_short = closes.ewm(span=short, adjust=False).mean()
-    ema_long = closes.ewm(span=long, adjust=False).mean()
-    return ema_short, ema_long
+# (ticker, span) -> (직전 확정 봉 시각, 해당 봉까지의 EMA)
+_EMA_STATE = {}
 
+# span -> (alpha, 1 - alpha)
+_EMA_COEFS = {span: (2.0 / (span + 1), 1.0 - 2.0 / (span + 1)) for span in (EMA_SHORT, EMA_LONG)}
 
-def get_krw_balance():
-    """KRW 잔고 조회"""
+
+def _ema_coefs(span):
+    coefs = _EMA_COEFS.get(span)
+    if coefs is None:
+        coefs = _EMA_COEFS[span] = (2.0 / (span + 1), 1.0 - 2.0 / (span + 1))
+    return coefs
+
+
+def _ema_last_two(ticker, closes, index, span):
+    """직전 확정 봉의 EMA를 보관해 두고 (이전, 현재) EMA만 점화식으로 갱신"""
+    alpha, decay = _ema_coefs(span)
+    prev_ts = index[-2]
+    state = _EMA_STATE.get((ticker, span))
+    if state is not None and state[0] == prev_ts:
+        # 같은 봉 안에서의 재계산: 진행 중인 봉만 반영
+        ema_prev = state[1]
+    elif state is not None and state[0] == index[-3]:
+        # 봉이 하나 넘어감: 새로 확정된 봉 하나만 반영
+        ema_prev = alpha * closes[-2] + decay * state[1]
+    else:
+        # 최초 실행 또는 봉 누락 시 전체 구간으로 초기값 계산 (ewm(adjust=False)와 동일)
+        ema_prev = closes[0]
+        for x in closes[1:-1]:
+            ema_prev = alpha * x + decay * ema_prev
+    _EMA_STATE[(ticker, span)] = (prev_ts, ema_prev)
+    ema_cur = alpha * closes[-1] + decay * ema_prev
+    return ema_prev, ema_cur
+
+
+def calculate_emas(ticker, df, short=EMA_SHORT, long=EMA_LONG):
+    """(prev_short, cur_short, prev_long, cur_long) 반환"""
+    closes = df['close'].to_numpy(dtype=float).tolist()
+    index = df.index
+    prev_short, cur_short = _ema_last_two(ticker, closes, index, short)
+    prev_long, cur_long = _ema_last_two(ticker, closes, index, long)
+    return prev_short, cur_short, prev_long, cur_long
+
+
+def get_balances_snapshot():
+    """전체 잔고를 한 번에 조회해 {currency: balance} 형태로 반환 (루프당 1회)"""
     if DRY_RUN or upbit is None:
-        # 시뮬레이션: 환경변수 또는 100,000원으로 가정
-        krw_sim = float(os.getenv("SIM_KRW_BALANCE", "100000"))
-        return krw_sim
+        # 시뮬레이션: 환경변수 또는 KRW 100,000원 / 코인 0으로 가정
+        return dict(SIM_BALANCES)
     try:
-        balances = upbit.get_balances()
-        for b in balances:
-            if b['currency'] == 'KRW':
-                return float(b['balance'])
+        return {b['currency']: float(b.get('balance', 0) or 0) for b in upbit.get_balances()}
     except Exception as e:
-        logger.error(f"get_krw_balance error: {e}")
-    return 0.0
+        logger.error("get_balances error: %s", e)
+    return {}
+
+
+def get_krw_balance(balances):
+    """KRW 잔고 조회"""
+    return balances.get("KRW", 0.0)
 
 
-def get_coin_balance(ticker):
+def get_coin_balance(ticker, balances):
     """코인(종목) 잔고 조회. ticker 예: 'KRW-BTC' -> currency 'BTC'"""
-    currency = ticker.split("-")[1]
-    if DRY_RUN or upbit is None:
-        # 시뮬레이션: 0으로 시작
-        return float(os.getenv(f"SIM_BAL_{currency}", "0"))
-    try:
-        balances = upbit.get_balances()
-        for b in balances:
-            if b['currency'] == currency:
-                return float(b.get('balance', 0) or 0)
-    except Exception as e:
-        logger.error(f"get_coin_balance error: {e}")
-    return 0.0
+    currency = _CURRENCY.get(ticker) or ticker.split("-", 1)[1]
+    return balances.get(currency, 0.0)
 
 
 def place_market_buy(ticker, krw_amount):
     """시장가 매수"""
     krw_amount = float(krw_amount)
     if krw_amount < MIN_KRW_ORDER:
-        logger.info(f"매수 금액 {krw_amount} KRW < 최소 {MIN_KRW_ORDER}원, 주문 취소")
+        logger.info("매수 금액 %s KRW < 최소 %s원, 주문 취소", krw_amount, MIN_KRW_ORDER)
         return None
     if DRY_RUN or upbit is None:
-        logger.info(f"[DRY_RUN] BUY {ticker} KRW {krw_amount:.0f}")
+        logger.info("[DRY_RUN] BUY %s KRW %.0f", ticker, krw_amount)
         return {"result": "dry_run", "ticker": ticker, "krw": krw_amount}
     try:
         resp = upbit.buy_market_order(ticker, krw_amount)
-        logger.info(f"BUY order placed: {resp}")
+        logger.info("BUY order placed: %s", resp)
         return resp
     except Exception as e:
-        logger.error(f"buy_market_order error: {e}")
-        logger.debug(traceback.format_exc())
+        logger.error("buy_market_order error: %s", e)
+        logger.debug("traceback", exc_info=True)
         return None
 
 
@@ -130,104 +241,177 @@ def place_market_sell(ticker, volume):
     """시장가 매도"""
     volume = float(volume)
     if DRY_RUN or upbit is None:
-        logger.info(f"[DRY_RUN] SELL {ticker} Volume {volume}")
+        logger.info("[DRY_RUN] SELL %s Volume %s", ticker, volume)
         return {"result": "dry_run", "ticker": ticker, "vol": volume}
     try:
         resp = upbit.sell_market_order(ticker, volume)
-        logger.info(f"SELL order placed: {resp}")
+        logger.info("SELL order placed: %s", resp)
         return resp
     except Exception as e:
-        logger.error(f"sell_market_order error: {e}")
-        logger.debug(traceback.format_exc())
+        logger.error("sell_market_order error: %s", e)
+        logger.debug("traceback", exc_info=True)
         return None
 
 
-def ticker_price(ticker):
-    """현재가 조회"""
+# 마지막으로 파일에 기록된 상태 (변경이 없으면 다시 쓰지 않음)
+_SAVED_STATE = {t: None for t in COINS}
+
+
+def load_state():
+    """STATE_FILE에서 코인별 마지막 신호 {"signal", "ts"} 복원 (없거나 읽기 실패 시 모두 None)"""
+    global _SAVED_STATE
+    state = {t: None for t in COINS}
     try:
-        ticker_info = pyupbit.get_orderbook(tickers=[ticker])
-        if ticker_info and len(ticker_info) > 0:
-            return float(ticker_info[0]['orderbook_units'][0]['ask_price'])
+        with open(STATE_FILE, "rb") as f:
+            saved = json.loads(f.read()).get("last_signal")
+        if not isinstance(saved, dict):
+            raise ValueError("last_signal이 dict가 아님")
+    except FileNotFoundError:
+        return state
     except Exception as e:
-        logger.warning(f"ticker_price error: {e}")
-    return None
+        logger.warning("state 파일 읽기 실패: %s", e)
+        return state
+    state.update({t: {"signal": v["signal"], "ts": v["ts"]} for t, v in saved.items()
+                  if t in state and isinstance(v, dict)
+                  and v.get("signal") in ("buy", "sell") and isinstance(v.get("ts"), str)})
+    _SAVED_STATE = dict(state)
+    return state
+
+
+def save_state(last_signal):
+    """상태가 바뀐 경우에만 임시 파일에 쓴 뒤 교체 (원자적 저장)"""
+    global _SAVED_STATE
+    if last_signal == _SAVED_STATE:
+        return
+    tmp = STATE_FILE + ".tmp"
+    try:
+        data = json.dumps({"last_signal": last_signal}, ensure_ascii=False, separators=(",", ":"))
+        with open(tmp, "wb") as f:
+            f.write(data.encode("utf-8"))
+        os.replace(tmp, STATE_FILE)
+        _SAVED_STATE = dict(last_signal)
+    except Exception as e:
+        logger.warning("state 파일 저장 실패: %s", e)
 
 
-def main_loop():
-    logger.info(f"Starting main loop. Coins: {COINS}, Interval: {INTERVAL}")
-    last_signal = {t: None for t in COINS}  # 'buy'/'sell'/None
-    while True:
-        try:
-            krw_balance = get_krw_balance()
-            logger.info(f"KRW Balance: {krw_balance:.0f} KRW")
-
-            for ticker in COINS:
-                df = safe_get_ohlcv(ticker, interval=INTERVAL, count=EMA_LONG + 10)
-                if df is None:
-                    logger.warning(f"OHLCV data 가져올 수 없음: {ticker}")
-                    continue
-
-                ema_short, ema_long = calculate_emas(df, EMA_SHORT, EMA_LONG)
-                # 현재와 이전의 EMA 값
-                cur_short = ema_short.iloc[-1]
-                cur_long = ema_long.iloc[-1]
-                prev_short = ema_short.iloc[-2]
-                prev_long = ema_long.iloc[-2]
-
-                logger.info(f"{ticker} EMA{EMA_SHORT:.0f}:{cur_short:.1f} EMA{EMA_LONG:.0f}:{cur_long:.1f}")
-
-                signal = None
-                # 골든 크로스: 이전에는 short <= long, 현재 short > long
-                if prev_short <= prev_long and cur_short > cur_long:
-                    signal = "buy"
-                # 데드 크로스: 이전에는 short >= long, 현재 short < long
-                elif prev_short >= prev_long and cur_short < cur_long:
-                    signal = "sell"
-
-                # 상태 판단 및 주문
-                if signal == "buy":
-                    # 이미 포지션 있는지 확인
-                    coin_bal = get_coin_balance(ticker)
-                    logger.info(f"{ticker} 현재 코인잔고: {coin_bal}")
-                    if coin_bal <= 0:
-                        buy_krw = krw_balance * ALLOCATION_PER_TRADE
-                        buy_krw = max(buy_krw, 0)
-                        if buy_krw >= MIN_KRW_ORDER:
-                            logger.info(f"{ticker} 매수 신호 감지 -> 매수 시도 KRW {buy_krw:.0f}")
-                            place_market_buy(ticker, buy_krw)
-                            last_signal[ticker] = "buy"
-                        else:
-                            logger.info(f"{ticker} 매수 신호였으나 매수금액 부족: {buy_krw:.0f} KRW")
-                    else:
-                        logger.info(f"{ticker} 이미 잔고가 있어 매수하지 않음 (잔고: {coin_bal})")
-                elif signal == "sell":
-                    coin_bal = get_coin_balance(ticker)
-                    if coin_bal > 0:
-                        # 자산 가치를 계산해 최소 주문 금액 확인
-                        price = ticker_price(ticker) or df['close'].iloc[-1]
-                        value_krw = coin_bal * price
-                        if value_krw >= MIN_KRW_ORDER:
-                            logger.info(f"{ticker} 매도 신호 감지 -> 전량 매도 시도 (수량 {coin_bal})")
-                            place_market_sell(ticker, coin_bal)
-                            last_signal[ticker] = "sell"
-                        else:
-                            logger.info(f"{ticker} 매도 가능하나 가치 {value_krw:.0f}원 < 최소 {MIN_KRW_ORDER}원, 매도하지 않음")
-                    else:
-                        logger.info(f"{ticker} 보유 없음, 매도 안함")
-                else:
-                    logger.debug(f"{ticker} 신호 없음")
+# 종료 요청 이벤트 (SIGTERM/SIGINT 시 set → 대기 중이던 루프가 즉시 종료)
+_STOP = threading.Event()
 
-                time.sleep(1)  # 여러 코인 조회 시 API 부하 완화
 
-        except KeyboardInterrupt:
-            logger.info("사용자 중단 (KeyboardInterrupt). 종료합니다.")
-            break
-        except Exception as e:
-            logger.error(f"메인 루프 예외: {e}")
-            logger.debug(traceback.format_exc())
+def _handle_stop_signal(signum, frame):
+    _STOP.set()
+    if signum != signal.SIGINT:
+        logger.info("종료 신호 수신 (%s). 현재 라운드를 마치고 종료합니다.", signal.Signals(signum).name)
+        return
+    logger.info("종료 신호 수신 (SIGINT). 현재 라운드를 마치고 종료합니다 (Ctrl-C 한 번 더: 즉시 종료).")
+    # pyupbit 요청에는 timeout이 없으므로, 응답 대기 중 멈췄을 때 두 번째 Ctrl-C는
+    # KeyboardInterrupt로 라운드를 끊고 finally에서 상태를 저장한 뒤 종료
+    signal.signal(signal.SIGINT, signal.default_int_handler)
 
-        time.sleep(SLEEP_SECONDS)
+
+def main_loop():
+    logger.info("Starting main loop. Coins: %s, Interval: %s", COINS, INTERVAL)
+    last_signal = load_state()  # ticker -> {"signal": 'buy'/'sell', "ts": 신호가 난 봉 시각} 또는 None
+    balances = {}
+    rounds_since_sync = RESYNC_EVERY_TICKS  # 첫 라운드에는 반드시 조회
+    try:
+        while not _STOP.is_set():
+            try:
+                # 잔고는 주문 직후 또는 RESYNC_EVERY_TICKS 라운드마다만 다시 조회
+                if not balances or rounds_since_sync >= RESYNC_EVERY_TICKS:
+                    balances = get_balances_snapshot()
+                    rounds_since_sync = 0
+                rounds_since_sync += 1
+                krw_balance = get_krw_balance(balances)
+                summary = []  # 라운드 끝에 한 줄로 출력할 코인별 EMA 현황
+
+                # 모든 코인의 OHLCV를 동시에 요청
+                futures = {t: _FETCH_POOL.submit(safe_get_ohlcv, t, INTERVAL, EMA_LONG + 10) for t in COINS}
+
+                for ticker, fut in futures.items():
+                    df = fut.result()
+                    if df is None:
+                        logger.warning("OHLCV data 가져올 수 없음: %s", ticker)
+                        continue
+
+                    # 현재와 이전의 EMA 값
+                    prev_short, cur_short, prev_long, cur_long = calculate_emas(ticker, df, EMA_SHORT, EMA_LONG)
+
+                    summary.append((ticker, cur_short, cur_long))
+
+                    action = None
+                    # 골든 크로스: 이전에는 short <= long, 현재 short > long
+                    if prev_short <= prev_long and cur_short > cur_long:
+                        action = "buy"
+                    # 데드 크로스: 이전에는 short >= long, 현재 short < long
+                    elif prev_short >= prev_long and cur_short < cur_long:
+                        action = "sell"
+
+                    # 상태 판단 및 주문 (크로스는 진행 중인 봉에서 판단하므로 그 봉 시각으로 같은 크로스인지 구분)
+                    candle_ts = df.index[-1].isoformat()
+                    if action == "buy" and last_signal[ticker] == {"signal": "buy", "ts": candle_ts}:
+                        # 같은 봉의 골든 크로스에서 이미 매수함 (봉이 끝나기 전 신호가 반복되거나 재시작한 경우)
+                        logger.debug("%s 이미 매수한 골든 크로스, 재매수하지 않음", ticker)
+                    elif action == "buy":
+                        # 이미 포지션 있는지 확인
+                        coin_bal = get_coin_balance(ticker, balances)
+                        logger.info("%s 현재 코인잔고: %s", ticker, coin_bal)
+                        if coin_bal <= 0:
+                            buy_krw = krw_balance * ALLOCATION_PER_TRADE
+                            buy_krw = max(buy_krw, 0)
+                            if buy_krw >= MIN_KRW_ORDER:
+                                logger.info("%s 매수 신호 감지 -> 매수 시도 KRW %.0f", ticker, buy_krw)
+                                place_market_buy(ticker, buy_krw)
+                                rounds_since_sync = RESYNC_EVERY_TICKS  # 다음 라운드에 잔고 재조회
+                                last_signal[ticker] = {"signal": "buy", "ts": candle_ts}
+                            else:
+                                logger.info("%s 매수 신호였으나 매수금액 부족: %.0f KRW", ticker, buy_krw)
+                        else:
+                            logger.info("%s 이미 잔고가 있어 매수하지 않음 (잔고: %s)", ticker, coin_bal)
+                    elif action == "sell":
+                        coin_bal = get_coin_balance(ticker, balances)
+                        if coin_bal > 0:
+                            # 자산 가치를 계산해 최소 주문 금액 확인 (진행 중인 봉의 종가 = 현재가)
+                            price = float(df['close'].iloc[-1])
+                            value_krw = coin_bal * price
+                            if value_krw >= MIN_KRW_ORDER:
+                                logger.info("%s 매도 신호 감지 -> 전량 매도 시도 (수량 %s)", ticker, coin_bal)
+                                place_market_sell(ticker, coin_bal)
+                                rounds_since_sync = RESYNC_EVERY_TICKS  # 다음 라운드에 잔고 재조회
+                            else:
+                                logger.info("%s 매도 가능하나 가치 %.0f원 < 최소 %s원, 매도하지 않음", ticker, value_krw, MIN_KRW_ORDER)
+                        else:
+                            logger.info("%s 보유 없음, 매도 안함", ticker)
+                        # 데드 크로스가 나면 다음 골든 크로스에서 다시 매수할 수 있도록 표시
+                        last_signal[ticker] = {"signal": "sell", "ts": candle_ts}
+                    elif logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("%s 신호 없음", ticker)
+
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info("KRW %.0f | EMA%d/EMA%d %s", krw_balance, EMA_SHORT, EMA_LONG,
+                                ", ".join("%s %.1f/%.1f" % item for item in summary))
+
+            except KeyboardInterrupt:
+                # 두 번째 Ctrl-C (또는 시그널 핸들러 없이 main_loop를 직접 호출한 경우)
+                logger.info("사용자 중단 (KeyboardInterrupt). 종료합니다.")
+                break
+            except Exception as e:
+                logger.error("메인 루프 예외: %s", e)
+                logger.debug("traceback", exc_info=True)
+
+            # 한 라운드의 상태 변경을 모아서 한 번만 저장
+            save_state(last_signal)
+            if _STOP.wait(SLEEP_SECONDS):
+                break
+    finally:
+        save_state(last_signal)
 
 
 if __name__ == "__main__":
-    main_loop()
\ No newline at end of file
+    signal.signal(signal.SIGTERM, _handle_stop_signal)
+    signal.signal(signal.SIGINT, _handle_stop_signal)
+    main_loop()
+    # 응답 없는 요청에 묶인 풀 스레드가 있으면 인터프리터 종료 시 join에서 멈추므로,
+    # 상태 저장이 끝난 뒤 로그만 비우고 바로 종료
+    logging.shutdown()
+    os._exit(0)
\ No newline at end of file
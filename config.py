@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+공통 전략 설정 (bot.py / backtest.py 공용)
+- import 시 부수효과가 없도록 상수만 둠 (.env 로드, API 클라이언트 생성 등은 bot.py에서)
+"""
+
+COINS = ("KRW-BTC", "KRW-ETH", "KRW-XRP")
+INTERVAL = "minute15"
+EMA_SHORT = 7
+EMA_LONG = 25